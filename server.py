@@ -1,23 +1,298 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+import orjson
+from cachetools import TTLCache
+from youtube_transcript_api import YouTubeTranscriptApi
 import youtube_summarizer
 import time
 import os
+import hashlib
+import random
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # Import the timestamps feature
 import timestamps_feature
+from timestamps_feature import split_sentences
 
 # For fact check functionality
+import numpy as np
+import torch
 from transformers import pipeline
 from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+class OrjsonProvider(JSONProvider):
+    """Serialize JSON requests and responses with orjson."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for all routes
 
-# Create caches
-summary_cache = {}
-timestamps_cache = {}
-segment_cache = {}
+# Create caches (bounded, entries expire after a day)
+CACHE_MAXSIZE = 1024
+CACHE_TTL = 86400
+
+summary_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+timestamps_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+segment_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+transcript_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+
+# Comment sentiment drifts slowly, so fact checks are kept for an hour
+factcheck_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=3600)
+
+memory_caches = {
+    'summary': summary_cache,
+    'timestamps': timestamps_cache,
+    'segment': segment_cache,
+    'transcript': transcript_cache,
+    'factcheck': factcheck_cache,
+}
+
+# Parameters each video has been cached with, used for near-miss lookups
+cache_variants = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+
+# cachetools caches are not thread-safe
+_cache_lock = threading.Lock()
+
+# Persistent cache shared by all workers and kept across restarts
+try:
+    import diskcache
+    disk_cache = diskcache.Cache('cache')
+except ImportError:
+    print("diskcache not available. Results are only cached in memory.")
+    disk_cache = None
+
+def cache_get(name, key):
+    """Look up a cached result in memory first, then in the persistent cache."""
+    cache = memory_caches[name]
+    with _cache_lock:
+        result = cache.get(key)
+    if result is not None:
+        return result
+
+    if disk_cache is not None:
+        result = disk_cache.get((name, key))
+        if result is not None:
+            with _cache_lock:
+                cache[key] = result
+            return result
+
+    return None
+
+def cache_set(name, key, result):
+    """Store a result in memory and in the persistent cache."""
+    cache = memory_caches[name]
+    with _cache_lock:
+        cache[key] = result
+    if disk_cache is not None:
+        disk_cache.set((name, key), result, expire=cache.ttl)
+
+def add_variant(kind, video_id, params, name, key):
+    """Record that a result for video_id with the given parameters is cached under key."""
+    with _cache_lock:
+        variants = cache_variants.get((kind, video_id), [])
+        if (params, name, key) not in variants:
+            cache_variants[(kind, video_id)] = variants + [(params, name, key)]
+
+def cache_get_nearest(kind, video_id, distance):
+    """Return (params, result) for the closest cached variant of video_id.
+    
+    distance(params) returns how far a cached variant is from the request,
+    or None if it is not close enough to be reused.
+    """
+    with _cache_lock:
+        variants = cache_variants.get((kind, video_id), [])
+    
+    candidates = []
+    for params, name, key in variants:
+        d = distance(params)
+        if d is not None:
+            candidates.append((d, params, name, key))
+    
+    for _, params, name, key in sorted(candidates, key=lambda c: c[0]):
+        result = cache_get(name, key)
+        if result is not None:
+            return params, result
+    
+    return None, None
+
+# Results currently being computed, so concurrent identical requests share one computation
+INFLIGHT_TIMEOUT = 120
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def coalesce(name, key, compute):
+    """Run compute() and cache its result, letting concurrent callers for the same key wait on it.
+    
+    A None result is returned to every caller but not cached.
+    """
+    with _inflight_lock:
+        future = _inflight.get((name, key))
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[(name, key)] = future
+    
+    if not owner:
+        print(f"Waiting for in-flight {name} result for {key}")
+        return future.result(timeout=INFLIGHT_TIMEOUT)
+    
+    try:
+        # Another request may have finished between the caller's cache check and now
+        result = cache_get(name, key)
+        if result is None:
+            result = compute()
+            if result is not None:
+                cache_set(name, key, result)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop((name, key), None)
+
+def get_transcript(video_id):
+    """Fetch a video's transcript once and share it between all endpoints.
+    
+    Returns a (transcript_items, transcript_text) tuple.
+    """
+    cached = cache_get('transcript', video_id)
+    if cached is not None:
+        return cached
+    
+    def compute():
+        transcript_items = YouTubeTranscriptApi.get_transcript(video_id)
+        transcript = ' '.join(item['text'] for item in transcript_items if item.get('text'))
+        print(f"Retrieved transcript with {len(transcript.split())} words")
+        return transcript_items, transcript
+    
+    return coalesce('transcript', video_id, compute)
+
+def try_get_transcript(video_id):
+    """Like get_transcript, but returns (None, None) if the transcript can't be fetched."""
+    try:
+        return get_transcript(video_id)
+    except Exception as e:
+        print(f"Error fetching transcript: {e}")
+        return None, None
+
+# Sentiment model shared by all fact check requests
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+SENTIMENT_ONNX_DIR = os.path.join('.cache', 'sentiment-onnx-int8')
+SENTIMENT_PIPELINE = None
+_sentiment_lock = threading.Lock()
+
+# Threads each worker process gives to model inference, so gunicorn workers don't oversubscribe the CPU
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+MODEL_THREADS = int(os.environ.get('MODEL_THREADS', max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)))
+
+def _load_quantized_sentiment():
+    """Build an INT8-quantized ONNX Runtime sentiment pipeline for CPU inference."""
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from optimum.pipelines import pipeline as ort_pipeline
+    from transformers import AutoTokenizer
+
+    quantized_file = "model_quantized.onnx"
+    if not os.path.exists(os.path.join(SENTIMENT_ONNX_DIR, quantized_file)):
+        # Export and quantize once, later starts reuse the saved model
+        print("Exporting and quantizing sentiment model to ONNX...")
+        os.makedirs(os.path.dirname(SENTIMENT_ONNX_DIR), exist_ok=True)
+        export_dir = tempfile.mkdtemp(dir=os.path.dirname(SENTIMENT_ONNX_DIR))
+        try:
+            ort_model = ORTModelForSequenceClassification.from_pretrained(SENTIMENT_MODEL, export=True)
+            ort_model.save_pretrained(export_dir)
+            AutoTokenizer.from_pretrained(SENTIMENT_MODEL).save_pretrained(export_dir)
+
+            quantizer = ORTQuantizer.from_pretrained(ort_model)
+            qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            quantizer.quantize(save_dir=export_dir, quantization_config=qconfig)
+
+            # Move the finished export into place in one step, so workers exporting
+            # at the same time never load a partial model
+            try:
+                os.replace(export_dir, SENTIMENT_ONNX_DIR)
+            except OSError:
+                if not os.path.exists(os.path.join(SENTIMENT_ONNX_DIR, quantized_file)):
+                    raise
+                print("Another worker exported the sentiment model first")
+        finally:
+            shutil.rmtree(export_dir, ignore_errors=True)
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = MODEL_THREADS
+
+    model = ORTModelForSequenceClassification.from_pretrained(
+        SENTIMENT_ONNX_DIR,
+        file_name=quantized_file,
+        session_options=session_options
+    )
+    tokenizer = AutoTokenizer.from_pretrained(SENTIMENT_ONNX_DIR)
+    return ort_pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, accelerator="ort")
+
+def _init_sentiment():
+    """Load the sentiment analysis pipeline once per process."""
+    global SENTIMENT_PIPELINE
+
+    if SENTIMENT_PIPELINE is not None:
+        return SENTIMENT_PIPELINE
+
+    with _sentiment_lock:
+        if SENTIMENT_PIPELINE is None:
+            print("Loading sentiment analysis model...")
+            if not torch.cuda.is_available():
+                try:
+                    SENTIMENT_PIPELINE = _load_quantized_sentiment()
+                    print("Using INT8 ONNX Runtime sentiment model")
+                except ImportError:
+                    print("optimum[onnxruntime] not available. Using PyTorch sentiment model.")
+                except Exception as e:
+                    print(f"Warning: Could not load quantized sentiment model: {e}")
+
+            if SENTIMENT_PIPELINE is None:
+                SENTIMENT_PIPELINE = pipeline(
+                    "sentiment-analysis",
+                    model=SENTIMENT_MODEL,
+                    device=0 if torch.cuda.is_available() else -1
+                )
+    return SENTIMENT_PIPELINE
+
+def classify_sentiments(sentiment_analyzer, texts, batch_size=64):
+    """Return the predicted label id of each text, taken directly from the model logits."""
+    tokenizer = sentiment_analyzer.tokenizer
+    model = sentiment_analyzer.model
+    
+    labels = []
+    with torch.inference_mode():
+        for i in range(0, len(texts), batch_size):
+            encoded = tokenizer(
+                texts[i:i + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=128,
+                return_tensors='pt'
+            ).to(model.device)
+            logits = model(**encoded).logits
+            labels.append(np.argmax(logits.cpu().numpy(), axis=1))
+    
+    if not labels:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(labels)
 
 @app.route('/api/summarize', methods=['POST', 'OPTIONS'])
 def summarize_video():
@@ -30,9 +305,10 @@ def summarize_video():
         return jsonify({'error': 'No video ID provided'}), 400
 
     cache_key = f"{video_id}_{data.get('minLength', 150)}_{data.get('maxLength', 300)}"
-    if cache_key in summary_cache:
+    cached = cache_get('summary', cache_key)
+    if cached is not None:
         print(f"Using cached summary for video {video_id}")
-        return jsonify(summary_cache[cache_key])
+        return jsonify(cached)
     
     youtube_url = f"https://www.youtube.com/watch?v={video_id}"
     
@@ -40,21 +316,50 @@ def summarize_video():
         min_length = int(data.get('minLength', 150))
         max_length = int(data.get('maxLength', 300))
         
-        summary, transcript = youtube_summarizer.summarize_youtube_video(
-            youtube_url, 
-            min_length=min_length, 
-            max_length=max_length
-        )
+        # Reuse a summary generated with nearby length bounds
+        def distance(params):
+            cached_min, cached_max = params
+            if abs(cached_min - min_length) < 30 and abs(cached_max - max_length) < 50:
+                return abs(cached_min - min_length) + abs(cached_max - max_length)
+            return None
+        
+        _, nearest = cache_get_nearest('summary', video_id, distance)
+        if nearest is not None:
+            print(f"Using cached summary with nearby lengths for video {video_id}")
+            return jsonify(nearest)
+        
+        # Failures return None, so they are reported but not cached
+        def compute():
+            _, transcript = try_get_transcript(video_id)
+            if not transcript:
+                return None
+            
+            summary, transcript = youtube_summarizer.summarize_youtube_video(
+                youtube_url, 
+                min_length=min_length, 
+                max_length=max_length,
+                transcript=transcript
+            )
+            if transcript is None:
+                return None
+            
+            return {
+                'status': 'success',
+                'videoId': video_id,
+                'summary': summary,
+                'transcript': transcript,
+                'timestamp': time.time()
+            }
         
-        result = {
-            'status': 'success',
-            'videoId': video_id,
-            'summary': summary,
-            'transcript': transcript,
-            'timestamp': time.time()
-        }
+        result = coalesce('summary', cache_key, compute)
+        if result is None:
+            return jsonify({
+                'status': 'error',
+                'videoId': video_id,
+                'error': 'Could not retrieve transcript. The video might not have captions.'
+            }), 400
         
-        summary_cache[cache_key] = result
+        add_variant('summary', video_id, (min_length, max_length), 'summary', cache_key)
         return jsonify(result)
     
     except Exception as e:
@@ -65,32 +370,90 @@ def summarize_video():
         }
         return jsonify(error_response), 500
 
-@app.route('/api/timestamps', methods=['POST', 'OPTIONS'])
-def generate_video_timestamps():
+@app.route('/api/summarize_stream', methods=['POST', 'OPTIONS'])
+def summarize_video_stream():
+    """Stream the summary as plain text while it is generated."""
     if request.method == 'OPTIONS':
         return '', 200
-        
+    
     data = request.json
     video_id = data.get('videoId')
     if not video_id:
         return jsonify({'error': 'No video ID provided'}), 400
     
-    if video_id in timestamps_cache:
+    try:
+        min_length = int(data.get('minLength', 150))
+        max_length = int(data.get('maxLength', 300))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid summary length'}), 400
+    
+    _, transcript = try_get_transcript(video_id)
+    if not transcript:
+        return jsonify({'error': 'Could not retrieve transcript'}), 400
+    
+    pieces = youtube_summarizer.stream_summary(
+        transcript,
+        target_min_length=min_length,
+        target_max_length=max_length
+    )
+    return Response(stream_with_context(pieces), mimetype='text/plain')
+
+def _get_timestamps(video_id):
+    """Return the cached timestamps result for a video, generating it at most once.
+    
+    Returns None, without caching it, if timestamps could not be generated.
+    """
+    cached = cache_get('timestamps', video_id)
+    if cached is not None:
         print(f"Using cached timestamps for video {video_id}")
-        return jsonify(timestamps_cache[video_id])
+        return cached
     
-    try:
+    def compute():
         print(f"Generating timestamps for video {video_id}...")
-        timestamps = timestamps_feature.generate_timestamps(video_id)
+        transcript_items, _ = try_get_transcript(video_id)
+        if transcript_items is None:
+            return None
+        
+        timestamps = timestamps_feature.generate_timestamps(
+            video_id,
+            transcript_items=transcript_items,
+            fallback=False
+        )
+        if timestamps is None:
+            return None
         
-        result = {
+        return {
             'status': 'success',
             'videoId': video_id,
             'timestamps': timestamps,
             'timestamp': time.time()
         }
+    
+    return coalesce('timestamps', video_id, compute)
+
+def _timestamps_version(timestamps):
+    """Short content hash of a timestamps list, so segment summaries follow regenerated timestamps."""
+    return hashlib.blake2b(repr(timestamps).encode('utf-8'), digest_size=6).hexdigest()
+
+@app.route('/api/timestamps', methods=['POST', 'OPTIONS'])
+def generate_video_timestamps():
+    if request.method == 'OPTIONS':
+        return '', 200
+        
+    data = request.json
+    video_id = data.get('videoId')
+    if not video_id:
+        return jsonify({'error': 'No video ID provided'}), 400
+    
+    try:
+        result = _get_timestamps(video_id)
+        if result is None:
+            return jsonify({
+                'status': 'error',
+                'videoId': video_id,
+                'error': 'Could not generate timestamps for this video'
+            }), 500
         
-        timestamps_cache[video_id] = result
         return jsonify(result)
     
     except Exception as e:
@@ -114,22 +477,18 @@ def summarize_segment():
     if not video_id or segment_id is None:
         return jsonify({'error': 'Missing required parameters'}), 400
     
-    cache_key = f"{video_id}_{segment_id}"
-    if cache_key in segment_cache:
-        print(f"Using cached segment summary for video {video_id}, segment {segment_id}")
-        return jsonify(segment_cache[cache_key])
-    
     try:
-        if video_id in timestamps_cache:
-            timestamps = timestamps_cache[video_id]['timestamps']
-        else:
-            timestamps = timestamps_feature.generate_timestamps(video_id)
-            timestamps_cache[video_id] = {
-                'status': 'success',
-                'videoId': video_id,
-                'timestamps': timestamps,
-                'timestamp': time.time()
-            }
+        result = _get_timestamps(video_id)
+        if result is None:
+            return jsonify({'error': 'Could not generate timestamps for this video'}), 500
+        timestamps = result['timestamps']
+        
+        # Keyed on the timestamps version, so regenerated timestamps invalidate old summaries
+        cache_key = f"{video_id}_{segment_id}_{_timestamps_version(timestamps)}"
+        cached = cache_get('segment', cache_key)
+        if cached is not None:
+            print(f"Using cached segment summary for video {video_id}, segment {segment_id}")
+            return jsonify(cached)
         
         if segment_id >= len(timestamps) or segment_id < 0:
             return jsonify({'error': 'Invalid segment ID'}), 400
@@ -137,39 +496,42 @@ def summarize_segment():
         current = timestamps[segment_id]
         next_time = timestamps[segment_id + 1]["time"] if segment_id + 1 < len(timestamps) else None
         
+        transcript_items, _ = try_get_transcript(video_id)
         segment_text = timestamps_feature.get_segment_transcript(
             video_id, 
             current["time"], 
-            next_time
+            next_time,
+            transcript_items=transcript_items
         )
         
         if not segment_text.strip():
             return jsonify({'error': 'No transcript found for this segment'}), 404
         
-        try:
-            summary = youtube_summarizer.summarize_text(
-                segment_text,
-                target_min_length=30,
-                target_max_length=100
-            )
-        except TypeError:
-            summary = youtube_summarizer.summarize_text(
-                segment_text,
-                min_length=30,
-                max_length=100
-            )
-        
-        result = {
-            'status': 'success',
-            'videoId': video_id,
-            'segmentId': segment_id,
-            'summary': summary,
-            'timestamp': current["time"],
-            'formatted_time': current["formatted_time"],
-            'title': current["title"]
-        }
+        def compute():
+            try:
+                summary = youtube_summarizer.summarize_text(
+                    segment_text,
+                    target_min_length=30,
+                    target_max_length=100
+                )
+            except TypeError:
+                summary = youtube_summarizer.summarize_text(
+                    segment_text,
+                    min_length=30,
+                    max_length=100
+                )
+            
+            return {
+                'status': 'success',
+                'videoId': video_id,
+                'segmentId': segment_id,
+                'summary': summary,
+                'timestamp': current["time"],
+                'formatted_time': current["formatted_time"],
+                'title': current["title"]
+            }
         
-        segment_cache[cache_key] = result
+        result = coalesce('segment', cache_key, compute)
         return jsonify(result)
     
     except Exception as e:
@@ -194,18 +556,18 @@ def extract_keypoints():
     youtube_url = f"https://www.youtube.com/watch?v={video_id}"
     
     try:
+        _, transcript = try_get_transcript(video_id)
         summary, transcript = youtube_summarizer.summarize_youtube_video(
             youtube_url, 
             min_length=100, 
-            max_length=200
+            max_length=200,
+            transcript=transcript
         )
         
         if not summary:
             return jsonify({'error': 'Could not generate summary from transcript'}), 400
         
-        import re
-        sentences = re.split(r'(?<=[.!?])\s+', summary)
-        key_points = [s.strip() for s in sentences if len(s.strip()) > 20]
+        key_points = [s for s in (seg.strip() for seg in split_sentences(summary)) if len(s) > 20]
         
         return jsonify({
             'status': 'success',
@@ -245,47 +607,50 @@ def extract_keypoints_with_wiki():
     num_terms = int(data.get('numTerms', 8))
     
     cache_key = f"keypoints_wiki_{video_id}_{num_terms}"
-    if cache_key in summary_cache:
+    cached = cache_get('summary', cache_key)
+    if cached is not None:
         print(f"Using cached wiki key terms for video {video_id}")
-        return jsonify(summary_cache[cache_key])
+        return jsonify(cached)
+    
+    # A result for more terms can be truncated to the requested count
+    def distance(cached_terms):
+        return cached_terms - num_terms if cached_terms >= num_terms else None
+    
+    _, nearest = cache_get_nearest('keypoints_wiki', video_id, distance)
+    if nearest is not None:
+        print(f"Using cached wiki key terms with more terms for video {video_id}")
+        return jsonify(dict(nearest, keyPoints=nearest['keyPoints'][:num_terms]))
     
     try:
         try:
-            import nltk
-            nltk.download('punkt')
-            nltk.download('stopwords')
-        except Exception as e:
-            print(f"Warning: NLTK download issue: {e}")
-        
-        from youtube_transcript_api import YouTubeTranscriptApi
-        try:
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-            transcript = ' '.join([item['text'] for item in transcript_list])
-            print(f"Retrieved transcript with {len(transcript.split())} words")
+            _, transcript = get_transcript(video_id)
         except Exception as e:
             print(f"Error fetching transcript: {e}")
             return jsonify({'error': 'Could not retrieve transcript'}), 400
         
         import wikipedia_integration
-        print(f"Generating {num_terms} key terms with Wikipedia information...")
         
-        key_terms = wikipedia_integration.generate_key_points_with_wikipedia(
-            transcript, 
-            max_terms=num_terms
-        )
-        
-        print(f"Generated {len(key_terms)} key terms")
-        if len(key_terms) < num_terms:
-            print(f"Warning: Only generated {len(key_terms)} terms, expected {num_terms}")
-        
-        result = {
-            'status': 'success',
-            'videoId': video_id,
-            'keyPoints': key_terms,
-            'timestamp': time.time()
-        }
+        def compute():
+            print(f"Generating {num_terms} key terms with Wikipedia information...")
+            
+            key_terms = wikipedia_integration.generate_key_points_with_wikipedia(
+                transcript, 
+                max_terms=num_terms
+            )
+            
+            print(f"Generated {len(key_terms)} key terms")
+            if len(key_terms) < num_terms:
+                print(f"Warning: Only generated {len(key_terms)} terms, expected {num_terms}")
+            
+            return {
+                'status': 'success',
+                'videoId': video_id,
+                'keyPoints': key_terms,
+                'timestamp': time.time()
+            }
         
-        summary_cache[cache_key] = result
+        result = coalesce('summary', cache_key, compute)
+        add_variant('keypoints_wiki', video_id, num_terms, 'summary', cache_key)
         return jsonify(result)
     
     except Exception as e:
@@ -297,6 +662,72 @@ def extract_keypoints_with_wiki():
         print(f"Error in keypoints_wiki: {str(e)}")
         return jsonify(error_response), 500
 
+# Sentiment percentages are estimated from a random sample of this many comments
+SAMPLE_TARGET = 500
+
+# Thread pool for overlapping blocking network calls
+io_pool = ThreadPoolExecutor(max_workers=8)
+
+# YouTube Data API client shared by all requests
+YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
+_yt_client = None
+_yt_lock = threading.Lock()
+_yt_local = threading.local()
+
+def get_yt():
+    """Build the YouTube Data API client once and reuse it."""
+    global _yt_client
+    
+    with _yt_lock:
+        if _yt_client is None:
+            _yt_client = build(
+                'youtube', 'v3',
+                developerKey=YOUTUBE_API_KEY,
+                cache_discovery=False,
+                static_discovery=True
+            )
+    return _yt_client
+
+def _yt_http():
+    """Return this thread's HTTP connection, since httplib2 objects are not thread-safe."""
+    if not hasattr(_yt_local, 'http'):
+        _yt_local.http = build_http()
+    return _yt_local.http
+
+def fetch_comments(youtube, video_id, max_comments=None):
+    """Fetch top-level comments, requesting the next page while the current one is processed.
+    
+    Stops paging once max_comments comments have been collected.
+    """
+    def request_page(page_token=None):
+        params = {
+            'part': "snippet",
+            'videoId': video_id,
+            'textFormat': "plainText",
+            'maxResults': 100
+        }
+        if page_token:
+            params['pageToken'] = page_token
+        return youtube.commentThreads().list(**params).execute(http=_yt_http())
+
+    comments = []
+    response = request_page()
+    while response:
+        # Page tokens are sequential, so start the next fetch before extracting this page
+        items = response.get("items", [])
+        enough = max_comments is not None and len(comments) + len(items) >= max_comments
+        
+        next_page = None
+        if "nextPageToken" in response and not enough:
+            next_page = io_pool.submit(request_page, response["nextPageToken"])
+
+        for item in items:
+            comments.append(item["snippet"]["topLevelComment"]["snippet"]["textDisplay"])
+
+        response = next_page.result() if next_page else None
+
+    return comments
+
 @app.route('/api/factcheck', methods=['POST', 'OPTIONS'])
 def fact_check():
     if request.method == 'OPTIONS':
@@ -307,74 +738,63 @@ def fact_check():
     if not video_id:
         return jsonify({'error': 'No video ID provided'}), 400
 
+    cached = cache_get('factcheck', video_id)
+    if cached is not None:
+        print(f"Using cached fact check for video {video_id}")
+        return jsonify(cached)
+    
     try:
         # Fetch comments using the YouTube Data API
-        api_key = os.environ.get("YOUTUBE_API_KEY")
-        if not api_key:
-            raise Exception("YouTube API key not set. Please set the YOUTUBE_API_KEY environment variable.")
-        
-        youtube = build('youtube', 'v3', developerKey=api_key)
-        comments = []
-        request_comments = youtube.commentThreads().list(
-            part="snippet",
-            videoId=video_id,
-            textFormat="plainText",
-            maxResults=100
-        )
-        response = request_comments.execute()
-        while response:
-            for item in response.get("items", []):
-                comment = item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-                comments.append(comment)
-            if "nextPageToken" in response:
-                request_comments = youtube.commentThreads().list(
-                    part="snippet",
-                    videoId=video_id,
-                    textFormat="plainText",
-                    maxResults=100,
-                    pageToken=response["nextPageToken"]
-                )
-                response = request_comments.execute()
-            else:
-                break
+        def compute():
+            youtube = get_yt()
+            
+            # Load the sentiment model in the background while comments are fetched.
+            # fetch_comments itself waits on io_pool, so it must not run on that pool.
+            sentiment_future = io_pool.submit(_init_sentiment)
+            comments = fetch_comments(youtube, video_id, SAMPLE_TARGET * 4)
+
+            if not comments:
+                return None
+
+            sentiment_analyzer = sentiment_future.result()
+            
+            # A uniform sample is enough for the aggregate percentages, seeded so results are repeatable
+            sampled = len(comments) > SAMPLE_TARGET
+            analyzed = random.Random(video_id).sample(comments, SAMPLE_TARGET) if sampled else comments
+            
+            # The tokenizer truncates each comment to the model's 128 token input
+            labels = classify_sentiments(sentiment_analyzer, analyzed)
+            
+            label2id = sentiment_analyzer.model.config.label2id
+            counts = np.bincount(labels, minlength=len(label2id))
+            pos_count = int(counts[label2id['POSITIVE']])
+            neg_count = int(counts[label2id['NEGATIVE']])
+            total = len(labels)
+            
+            aggregated = {
+                'positive_percentage': round((pos_count / total * 100), 2) if total > 0 else 0,
+                'negative_percentage': round((neg_count / total * 100), 2) if total > 0 else 0,
+                'total_comments': len(comments),
+                'sampled': sampled,
+                'sample_size': total
+            }
+            
+            return {
+                'status': 'success',
+                'videoId': video_id,
+                'sentiment': aggregated,
+                'comments_sample': comments[:5]
+            }
         
-        if not comments:
+        result = coalesce('factcheck', video_id, compute)
+        if result is None:
             return jsonify({
                 'status': 'error',
                 'videoId': video_id,
                 'error': 'No comments found for this video'
             }), 404
-
-        # Helper function to truncate comments by words (if desired)
-        def truncate_text(text, max_words=128):
-            words = text.split()
-            if len(words) > max_words:
-                return " ".join(words[:max_words])
-            return text
-
-        # Truncate each comment by words
-        truncated_comments = [truncate_text(comment) for comment in comments]
-
-        # Run sentiment analysis with truncation enabled so that inputs beyond the model limit are trimmed
-        sentiment_analyzer = pipeline("sentiment-analysis")
-        sentiments = sentiment_analyzer(truncated_comments, truncation=True)
-
-        pos_count = sum(1 for s in sentiments if s['label'] == 'POSITIVE')
-        neg_count = sum(1 for s in sentiments if s['label'] == 'NEGATIVE')
-        total = len(sentiments)
-        
-        aggregated = {
-            'positive_percentage': round((pos_count / total * 100), 2) if total > 0 else 0,
-            'negative_percentage': round((neg_count / total * 100), 2) if total > 0 else 0,
-            'total_comments': total
-        }
         
-        return jsonify({
-            'status': 'success',
-            'videoId': video_id,
-            'sentiment': aggregated,
-            'comments_sample': comments[:5]
-        })
+        return jsonify(result)
     
     except Exception as e:
         print(f"Error in fact_check endpoint: {e}")
@@ -384,22 +804,67 @@ def fact_check():
             'error': str(e)
         }), 500
 
+# Set once the models have been loaded by the warmup thread
+model_ready = threading.Event()
+
+def _warmup():
+    """Load NLTK data and models in the background so first requests don't pay for it."""
+    print("Setting up NLTK resources and models...")
+    try:
+        timestamps_feature.initialize()
+        
+        # Resources used by the Wikipedia key terms feature
+        import wikipedia_integration
+        wikipedia_integration.initialize()
+    except Exception as e:
+        print(f"Warning: Error setting up NLTK resources: {e}")
+        print("Please run: python -m nltk.downloader punkt")
+    
+    try:
+        _init_sentiment()
+        youtube_summarizer.create_summarizer()
+    except Exception as e:
+        print(f"Warning: Error warming up models: {e}")
+    
+    model_ready.set()
+    print("Models warmed up")
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
+    if not model_ready.is_set():
+        return jsonify({
+            'status': 'warming',
+            'message': 'API is running, models are still loading'
+        })
+    
     return jsonify({
         'status': 'ok', 
         'message': 'API is running'
     })
 
-if __name__ == '__main__':
+def startup(background=True):
+    """Prepare the server: check the configuration, create the cache directory and warm up the models.
+    
+    With background=False the models are loaded before returning.
+    """
+    if not YOUTUBE_API_KEY:
+        raise RuntimeError("YouTube API key not set. Please set the YOUTUBE_API_KEY environment variable.")
+    
+    torch.set_num_threads(MODEL_THREADS)
     os.makedirs('cache', exist_ok=True)
-    print("Setting up NLTK resources...")
-    try:
-        import timestamps_feature
-        timestamps_feature.ensure_nltk_data()
-    except Exception as e:
-        print(f"Warning: Error downloading NLTK resources: {e}")
-        print("Please run: python -m nltk.downloader punkt")
+    if background:
+        threading.Thread(target=_warmup, daemon=True).start()
+    else:
+        _warmup()
+
+if __name__ == '__main__':
+    debug = os.environ.get('DEV') == '1'
+    
+    # The debug reloader runs this module in a watcher process and again in the
+    # serving child, so only load the models in the process that serves requests
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        startup()
     
+    # Development server only, use gunicorn with wsgi.py in production
     print("Starting YouTube NLP API server...")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=debug)
@@ -1,13 +1,51 @@
 import nltk
 from youtube_transcript_api import YouTubeTranscriptApi
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from scipy import sparse
 import numpy as np
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import re
 import os
 import sys
 
+# Native finite-state sentence splitter, much faster than NLTK's Punkt
+try:
+    from blingfire import text_to_sentences
+except ImportError:
+    text_to_sentences = None
+
+# JIT compiler for the window similarity kernel
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Let the Rust tokenizers use multiple threads
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'true')
+
+# Regexes used on every transcript, compiled once
+_WORD_RE = re.compile(r'\b\w+\b')
+_SENTENCE_RE = re.compile(r'[^.!?]+[.!?]')
+_SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])\s+')
+
+def split_sentences(text):
+    """Split text into sentences with blingfire if installed, else NLTK's Punkt, else a regex."""
+    if text_to_sentences is not None:
+        return [s for s in text_to_sentences(text).split("\n") if s]
+    try:
+        return nltk.sent_tokenize(text)
+    except LookupError:
+        # Punkt data has not been downloaded yet
+        return [s for s in _SENTENCE_BREAK_RE.split(text) if s]
+
+# Stop words for the fallback keyword extractor and the parts of speech kept by spaCy
+_STOP_WORDS = frozenset({"the", "a", "an", "and", "or", "but", "is", "are", "was", "were", "this", "that",
+                         "you", "i", "it", "he", "she", "they", "we", "to", "of", "in", "on", "at", "for"})
+_KEYWORD_POS = frozenset({'NOUN', 'PROPN'})
+
 # Global variables for models
 sentence_transformer = None
 nlp = None
@@ -46,8 +84,14 @@ def load_models():
         try:
             # Load Sentence Transformer for better semantic similarity
             from sentence_transformers import SentenceTransformer
+            import torch
             print("Loading SentenceTransformer model...")
             sentence_transformer = SentenceTransformer('all-MiniLM-L6-v2')
+            
+            # Transcript sentences are short, so a shorter max length avoids padding work
+            sentence_transformer.max_seq_length = 64
+            if torch.cuda.is_available():
+                sentence_transformer.half()
             print("SentenceTransformer model loaded successfully")
         except ImportError:
             print("SentenceTransformer not available. Using fallback TF-IDF.")
@@ -64,6 +108,31 @@ def load_models():
         except OSError:
             print("spaCy model not found. Using fallback tokenization.")
 
+# Set once NLTK data and models are ready, so requests skip the setup work
+_INITIALIZED = False
+_LOCK = threading.Lock()
+
+def initialize():
+    """Prepare NLTK data and load models once per process."""
+    global _INITIALIZED
+    
+    if _INITIALIZED:
+        return
+    
+    with _LOCK:
+        if not _INITIALIZED:
+            ensure_nltk_data()
+            load_models()
+            _INITIALIZED = True
+
+def _fetch_transcript(video_id):
+    """Fetch a transcript from YouTube.
+    
+    Callers that already have the transcript (the server caches it) should pass
+    it in instead, so a video is only downloaded once.
+    """
+    return YouTubeTranscriptApi.get_transcript(video_id)
+
 def segment_transcript_by_silence(transcript_items, min_silence_duration=1.0):
     """Find natural breaks in the transcript based on pauses in speech."""
     silence_boundaries = []
@@ -87,19 +156,117 @@ def segment_transcript_by_silence(transcript_items, min_silence_duration=1.0):
     
     return silence_boundaries
 
+def encode_sentences(sentences):
+    """Encode all sentences in one batched, L2-normalized SentenceTransformer pass."""
+    return sentence_transformer.encode(
+        sentences,
+        batch_size=128,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+
+# Shared TF-IDF settings: damped term counts and float32 halve the sparse matrix size
+TFIDF_PARAMS = dict(sublinear_tf=True, dtype=np.float32, max_features=20000)
+
+def make_tfidf(**kwargs):
+    """Create a TF-IDF vectorizer with the shared settings.
+    
+    Vocabularies are transcript-specific and fitting mutates the vectorizer, so
+    each call gets its own instance rather than sharing one across requests.
+    """
+    return TfidfVectorizer(**TFIDF_PARAMS, **kwargs)
+
 def calculate_sentence_embeddings(sentences):
     """Calculate embeddings for each sentence using Sentence Transformers."""
     global sentence_transformer
     
     if sentence_transformer is not None:
-        return sentence_transformer.encode(sentences)
+        return encode_sentences(sentences)
     else:
         # Fallback to TF-IDF if sentence transformers not available
-        vectorizer = TfidfVectorizer()
+        vectorizer = make_tfidf()
         return vectorizer.fit_transform(sentences).toarray()
 
-def segment_by_topic_shifts(sentences, sentence_timestamps):
-    """Identify topic shifts using semantic similarity between sentence windows."""
+if numba is not None:
+    # Serial on purpose: requests run on several threads, and numba's fallback
+    # workqueue threading layer aborts the process on concurrent parallel calls
+    @numba.njit(cache=True, fastmath=True)
+    def _window_sims(prefix, window_size):
+        """Compiled window similarity loop over prefix sums, without window temporaries."""
+        n = prefix.shape[0] - 1
+        sims = np.empty(n - window_size)
+        for i in range(n - window_size):
+            mid = i + window_size
+            end = min(mid + window_size, n)
+            dot = 0.0
+            norm1 = 0.0
+            norm2 = 0.0
+            for j in range(prefix.shape[1]):
+                a = prefix[mid, j] - prefix[i, j]
+                b = prefix[end, j] - prefix[mid, j]
+                dot += a * b
+                norm1 += a * a
+                norm2 += b * b
+            sims[i] = dot / np.sqrt(norm1 * norm2) if norm1 > 0.0 and norm2 > 0.0 else 0.0
+        return sims
+else:
+    _window_sims = None
+
+def window_similarities(embeddings, window_size):
+    """Cosine similarity between each window of sentences and the window that follows it.
+    
+    Entry i compares sentences [i, i+window_size) with [i+window_size, i+2*window_size),
+    the second window being cut short at the end of the transcript.
+    """
+    n = len(embeddings)
+    
+    # Prefix sums give every window sum with one subtraction; cosine is
+    # scale-invariant, so window sums stand in for window means
+    prefix = np.zeros((n + 1, embeddings.shape[1]))
+    np.cumsum(embeddings, axis=0, out=prefix[1:])
+    
+    if _window_sims is not None:
+        return _window_sims(prefix, window_size)
+    
+    starts = np.arange(n - window_size)
+    mids = starts + window_size
+    ends = np.minimum(mids + window_size, n)
+    window1 = prefix[mids] - prefix[starts]
+    window2 = prefix[ends] - prefix[mids]
+    
+    dots = np.einsum('ij,ij->i', window1, window2)
+    norms = np.linalg.norm(window1, axis=1) * np.linalg.norm(window2, axis=1)
+    
+    # A zero window has similarity 0, as in the compiled loop and the sparse path
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+def sparse_window_similarities(vectors, window_size):
+    """Sparse counterpart of window_similarities for TF-IDF sentence vectors."""
+    n = vectors.shape[0]
+    starts = np.arange(n - window_size)
+    mids = starts + window_size
+    ends = np.minimum(mids + window_size, n)
+    
+    def window_sums(lo, hi):
+        # Row i of the indicator selects sentences [lo[i], hi[i]), so one
+        # sparse product sums every window at once
+        lengths = hi - lo
+        rows = np.repeat(np.arange(len(lo)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        cols = np.repeat(lo, lengths) + offsets
+        indicator = sparse.csr_matrix((np.ones(len(cols)), (rows, cols)), shape=(len(lo), n))
+        return normalize(indicator @ vectors, copy=False)
+    
+    window1 = window_sums(starts, mids)
+    window2 = window_sums(mids, ends)
+    return np.asarray(window1.multiply(window2).sum(axis=1)).ravel()
+
+def segment_by_topic_shifts(sentences, sentence_timestamps, embeddings=None):
+    """Identify topic shifts using semantic similarity between sentence windows.
+    
+    Precomputed sentence embeddings can be passed in to avoid encoding again.
+    """
     window_size = 3  # Number of sentences in each window
     threshold = 0.5  # Similarity threshold for topic change
     
@@ -109,41 +276,20 @@ def segment_by_topic_shifts(sentences, sentence_timestamps):
     
     try:
         # Get sentence embeddings
-        if sentence_transformer is not None:
+        if embeddings is not None or sentence_transformer is not None:
             # Using SentenceTransformer
-            embeddings = sentence_transformer.encode(sentences)
+            if embeddings is None:
+                embeddings = encode_sentences(sentences)
             
             # Calculate similarity between consecutive windows
-            similarities = []
-            for i in range(len(sentences) - window_size):
-                window1 = embeddings[i:i+window_size]
-                window2 = embeddings[i+window_size:i+window_size*2]
-                
-                # Average the embeddings in each window
-                window1_avg = np.mean(window1, axis=0)
-                window2_avg = np.mean(window2, axis=0)
-                
-                # Calculate cosine similarity
-                similarity = np.dot(window1_avg, window2_avg) / (np.linalg.norm(window1_avg) * np.linalg.norm(window2_avg))
-                similarities.append(similarity)
+            similarities = window_similarities(embeddings, window_size)
         else:
             # Fallback to TF-IDF
-            vectorizer = TfidfVectorizer(stop_words='english')
-            vectors = vectorizer.fit_transform(sentences)
+            vectorizer = make_tfidf(stop_words='english')
+            vectors = vectorizer.fit_transform(sentences).tocsr()
             
             # Calculate similarity between consecutive windows
-            similarities = []
-            for i in range(len(sentences) - window_size):
-                window1 = vectors[i:i+window_size]
-                window2 = vectors[i+window_size:i+window_size*2]
-                
-                # Average the vectors in each window
-                window1_avg = window1.mean(axis=0)
-                window2_avg = window2.mean(axis=0)
-                
-                # Calculate cosine similarity
-                similarity = cosine_similarity(window1_avg, window2_avg)[0, 0]
-                similarities.append(similarity)
+            similarities = sparse_window_similarities(vectors, window_size)
         
         # Find boundaries (points of low similarity)
         topic_boundaries = [0]  # Always include the start
@@ -172,50 +318,38 @@ def segment_by_topic_shifts(sentences, sentence_timestamps):
             boundaries.append(len(sentences) - 1)
         return boundaries
 
-def extract_keywords(segment_text, num_keywords=3):
-    """Extract the most important keywords from text."""
-    global nlp
+# Keyword extraction only reads token.pos_ and token.is_stop; pos_ is set by the
+# attribute_ruler from the tagger output, so both of those must stay enabled
+KEYWORD_DISABLED_PIPES = ('parser', 'ner', 'lemmatizer')
+
+def keywords_from_doc(doc, num_keywords=3):
+    """Extract the most important keywords from a spaCy document."""
+    # Count nouns and proper nouns as potential keywords and get top keywords
+    keyword_counts = Counter(
+        token.text.lower() for token in doc
+        if token.pos_ in _KEYWORD_POS and not token.is_stop and len(token.text) > 3
+    )
+    keywords = [word for word, _ in keyword_counts.most_common(num_keywords)]
     
-    if nlp is not None:
-        try:
-            # Use spaCy for better keyword extraction
-            doc = nlp(segment_text)
-            
-            # Extract nouns and proper nouns as potential keywords
-            potential_keywords = []
-            for token in doc:
-                if token.pos_ in ('NOUN', 'PROPN') and not token.is_stop and len(token.text) > 3:
-                    potential_keywords.append(token.text.lower())
+    # If we don't have enough keywords, add important verbs
+    if len(keywords) < num_keywords:
+        verb_counts = Counter(
+            token.text.lower() for token in doc
+            if token.pos_ == 'VERB' and not token.is_stop and len(token.text) > 3
+        )
+        for word, _ in verb_counts.most_common(num_keywords - len(keywords)):
+            keywords.append(word)
             
-            # Count occurrences and get top keywords
-            keyword_counts = Counter(potential_keywords)
-            keywords = [word for word, _ in keyword_counts.most_common(num_keywords)]
-            
-            # If we don't have enough keywords, add important verbs
-            if len(keywords) < num_keywords:
-                verbs = [token.text.lower() for token in doc if token.pos_ == 'VERB' and not token.is_stop and len(token.text) > 3]
-                verb_counts = Counter(verbs)
-                for word, _ in verb_counts.most_common(num_keywords - len(keywords)):
-                    keywords.append(word)
-                    
-            return keywords[:num_keywords]  # Ensure we don't return more than requested
-        
-        except Exception as e:
-            print(f"Error with spaCy keyword extraction: {e}")
-            # Fall through to the fallback method
-    
-    # Fallback: simple TF-IDF
+    return keywords[:num_keywords]  # Ensure we don't return more than requested
+
+def extract_keywords_fallback(segment_text, num_keywords=3):
+    """Extract keywords by word frequency when spaCy is not available."""
     try:
-        # Remove common stop words
-        stop_words = {"the", "a", "an", "and", "or", "but", "is", "are", "was", "were", "this", "that", 
-                      "you", "i", "it", "he", "she", "they", "we", "to", "of", "in", "on", "at", "for"}
-        
-        # Tokenize and clean text
-        words = re.findall(r'\b\w+\b', segment_text.lower())
-        words = [word for word in words if word not in stop_words and len(word) > 3]
+        # Tokenize and clean text, removing common stop words
+        words = _WORD_RE.findall(segment_text.lower())
         
         # Get most frequent words
-        word_counts = Counter(words)
+        word_counts = Counter(word for word in words if word not in _STOP_WORDS and len(word) > 3)
         keywords = [word for word, _ in word_counts.most_common(num_keywords)]
         
         return keywords
@@ -223,17 +357,47 @@ def extract_keywords(segment_text, num_keywords=3):
         print(f"Error with fallback keyword extraction: {e}")
         return ["keyword"] * min(num_keywords, 3)  # Return placeholder keywords
 
-def generate_timestamps(video_id, min_segment_duration=20, max_segments=12):
-    """Generate high-precision timestamps with content-based segmentation."""
-    # Ensure NLTK resources are available
-    ensure_nltk_data()
+def extract_keywords_batch(segment_texts, num_keywords=3):
+    """Extract keywords for several texts, running spaCy over all of them as one batch."""
+    if nlp is not None:
+        try:
+            # Use spaCy for better keyword extraction, skipping components we don't read
+            disable = [name for name in KEYWORD_DISABLED_PIPES if name in nlp.pipe_names]
+            docs = nlp.pipe(segment_texts, batch_size=32, disable=disable)
+            return [keywords_from_doc(doc, num_keywords) for doc in docs]
+        
+        except Exception as e:
+            print(f"Error with spaCy keyword extraction: {e}")
+            # Fall through to the fallback method
     
-    # Load NLP models if available
-    load_models()
+    # Fallback: simple word frequency
+    return [extract_keywords_fallback(text, num_keywords) for text in segment_texts]
+
+def extract_keywords(segment_text, num_keywords=3):
+    """Extract the most important keywords from text."""
+    return extract_keywords_batch([segment_text], num_keywords)[0]
+
+def generate_timestamps(video_id, min_segment_duration=20, max_segments=12, transcript_items=None, fallback=True):
+    """Generate high-precision timestamps with content-based segmentation.
+    
+    The transcript is fetched unless the caller already has it. If generation
+    fails, a single placeholder segment is returned, or None with fallback=False.
+    """
+    transcript_future = None
+    if transcript_items is None:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Fetch the transcript while the local resources are prepared
+            transcript_future = executor.submit(_fetch_transcript, video_id)
+            
+            # Ensure NLTK resources and models are available (a no-op after startup)
+            initialize()
+    else:
+        initialize()
     
     try:
         # Get the transcript
-        transcript_items = YouTubeTranscriptApi.get_transcript(video_id)
+        if transcript_future is not None:
+            transcript_items = transcript_future.result()
         
         if not transcript_items:
             return [{
@@ -248,28 +412,24 @@ def generate_timestamps(video_id, min_segment_duration=20, max_segments=12):
         silence_boundaries = segment_transcript_by_silence(transcript_items)
         silence_times = [b['time'] for b in silence_boundaries if b['duration'] > 1.5]
         
-        # Convert transcript to text with mapping to timestamps
-        full_text = ""
-        time_mapping = {}
-        char_pos = 0
+        item_starts = np.fromiter((item["start"] for item in transcript_items), dtype=np.float64)
         
-        for item in transcript_items:
-            text = item["text"] + " "
-            full_text += text
-            
-            # Map each character to its timestamp
-            for _ in range(len(text)):
-                time_mapping[char_pos] = item["start"]
-                char_pos += 1
+        # Convert transcript to single-spaced text (blingfire normalizes whitespace, so its
+        # sentences must be exact substrings), keeping each caption's offset and start time
+        captions = [(" ".join(item["text"].split()), item["start"]) for item in transcript_items]
+        captions = [(text, start) for text, start in captions if text]
+        full_text = "".join(text + " " for text, _ in captions)
+        text_offsets = np.concatenate(([0], np.cumsum([len(text) + 1 for text, _ in captions], dtype=np.int64)))
+        text_starts = np.array([start for _, start in captions], dtype=np.float64)
         
         # Split the text into sentences
         try:
-            sentences = nltk.sent_tokenize(full_text)
+            sentences = split_sentences(full_text)
             print(f"Successfully tokenized into {len(sentences)} sentences")
         except Exception as e:
-            print(f"Error with NLTK sentence tokenization: {e}")
+            print(f"Error with sentence tokenization: {e}")
             # Fallback to simple regex-based sentence splitting
-            sentences = re.findall(r'[^.!?]+[.!?]', full_text)
+            sentences = _SENTENCE_RE.findall(full_text)
             print(f"Fallback tokenization found {len(sentences)} sentences")
         
         if not sentences:
@@ -309,19 +469,32 @@ def generate_timestamps(video_id, min_segment_duration=20, max_segments=12):
         
         # Store the timestamp for the start of each sentence
         sentence_timestamps = []
+        cursor = 0
         for sentence in sentences:
-            # Find position of first character of the sentence in full_text
-            start_pos = full_text.find(sentence)
+            # Sentences come in order, so search from the end of the previous one
+            start_pos = full_text.find(sentence, cursor)
             if start_pos != -1:
-                timestamp = time_mapping.get(start_pos, 0)
+                cursor = start_pos + len(sentence)
+                
+                # Binary search for the caption containing this character
+                caption_index = np.searchsorted(text_offsets, start_pos, side='right') - 1
+                timestamp = float(text_starts[caption_index])
                 sentence_timestamps.append(timestamp)
             else:
                 # Fallback to previous timestamp if we can't find the sentence
                 timestamp = sentence_timestamps[-1] if sentence_timestamps else 0
                 sentence_timestamps.append(timestamp)
         
+        # Encode every sentence once for the semantic analysis
+        embeddings = None
+        if sentence_transformer is not None:
+            try:
+                embeddings = encode_sentences(sentences)
+            except Exception as e:
+                print(f"Error encoding sentences: {e}")
+        
         # Find topic boundaries using semantic analysis
-        topic_boundaries = segment_by_topic_shifts(sentences, sentence_timestamps)
+        topic_boundaries = segment_by_topic_shifts(sentences, sentence_timestamps, embeddings)
         
         # Combine topic and silence boundaries
         all_boundary_times = []
@@ -360,48 +533,53 @@ def generate_timestamps(video_id, min_segment_duration=20, max_segments=12):
         # Sort one more time
         filtered_boundaries.sort()
         
+        # Assign every transcript item and sentence to its segment in one pass each,
+        # binary searching the segment start times
+        boundary_times = np.asarray(filtered_boundaries, dtype=np.float64)
+        
+        segment_texts = [[] for _ in filtered_boundaries]
+        item_segments = np.searchsorted(boundary_times, item_starts, side='right') - 1
+        for item, segment in zip(transcript_items, item_segments):
+            if segment >= 0:
+                segment_texts[segment].append(item["text"])
+        
+        # Only the first sentence of each segment is needed, for its title
+        first_sentences = [None] * len(filtered_boundaries)
+        sentence_segments = np.searchsorted(boundary_times, sentence_timestamps, side='right') - 1
+        for sentence, segment in zip(sentences, sentence_segments):
+            if segment >= 0 and first_sentences[segment] is None:
+                first_sentences[segment] = sentence
+        
+        # Extract keywords for all non-empty segments in one batch
+        segment_texts = [" ".join(texts) for texts in segment_texts]
+        non_empty = [i for i, text in enumerate(segment_texts) if text.strip()]
+        segment_keywords = dict(zip(non_empty, extract_keywords_batch([segment_texts[i] for i in non_empty])))
+        
         # Generate timestamps for each segment
         timestamps = []
         
         for i in range(len(filtered_boundaries)):
             start_time = filtered_boundaries[i]
             
-            # Get the end time for this segment
-            end_time = filtered_boundaries[i+1] if i < len(filtered_boundaries)-1 else None
-            
             # Format time for display
             minutes = int(start_time // 60)
             seconds = int(start_time % 60)
             formatted_time = f"{minutes}:{seconds:02d}"
             
-            # Find transcript in this segment
-            segment_text = ""
-            for item in transcript_items:
-                if item["start"] >= start_time and (end_time is None or item["start"] < end_time):
-                    segment_text += item["text"] + " "
-            
             # Set title and keywords
-            if not segment_text.strip():
+            if i not in segment_keywords:
                 title = f"Segment at {formatted_time}"
                 keywords = []
             else:
-                # Find sentences in this segment
-                segment_sentences = []
-                for j, timestamp in enumerate(sentence_timestamps):
-                    if timestamp >= start_time and (end_time is None or timestamp < end_time):
-                        if j < len(sentences):  # Ensure index is valid
-                            segment_sentences.append(sentences[j])
-                
                 # Get title from first sentence
-                if segment_sentences:
-                    title = segment_sentences[0]
+                if first_sentences[i] is not None:
+                    title = first_sentences[i]
                     if len(title) > 50:
                         title = title[:47] + "..."
                 else:
                     title = f"Segment at {formatted_time}"
                 
-                # Extract keywords
-                keywords = extract_keywords(segment_text)
+                keywords = segment_keywords[i]
             
             timestamps.append({
                 "time": start_time,
@@ -415,6 +593,8 @@ def generate_timestamps(video_id, min_segment_duration=20, max_segments=12):
     
     except Exception as e:
         print(f"Error generating timestamps: {e}")
+        if not fallback:
+            return None
         # Provide a basic fallback
         return [{
             "time": 0,
@@ -424,21 +604,20 @@ def generate_timestamps(video_id, min_segment_duration=20, max_segments=12):
             "segment_id": 0
         }]
 
-def get_segment_transcript(video_id, start_time, end_time=None):
+def get_segment_transcript(video_id, start_time, end_time=None, transcript_items=None):
     """Get transcript text for a specific segment of the video."""
     try:
-        # Get full transcript
-        transcript_items = YouTubeTranscriptApi.get_transcript(video_id)
+        # Get full transcript, unless the caller already has it
+        if transcript_items is None:
+            transcript_items = _fetch_transcript(video_id)
         
-        # Filter transcript items for this segment
-        segment_items = []
-        for item in transcript_items:
-            # If this item is within our segment time range
-            if item["start"] >= start_time and (end_time is None or item["start"] < end_time):
-                segment_items.append(item)
+        # Items are ordered by start time, so the segment is one contiguous slice
+        starts = np.fromiter((item["start"] for item in transcript_items), dtype=float, count=len(transcript_items))
+        lo = np.searchsorted(starts, start_time, 'left')
+        hi = len(starts) if end_time is None else np.searchsorted(starts, end_time, 'left')
         
         # Get text for this segment
-        segment_text = " ".join([item["text"] for item in segment_items])
+        segment_text = " ".join(item["text"] for item in transcript_items[lo:hi])
         
         return segment_text
     except Exception as e:
@@ -1,10 +1,70 @@
 import re
+import os
+import time
+import atexit
+import pickle
+import functools
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import spacy
-import time
-import wikipedia
+import requests
+from urllib.parse import quote
+import timestamps_feature
+from timestamps_feature import split_sentences
+
+# Advisory file locks, so workers merge their semantic cache entries instead of overwriting them
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Regexes used on every transcript and term, compiled once
+_WORD_RE = re.compile(r'\b[a-zA-Z]{4,}\b')
+_PHRASE_RE = re.compile(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)+\b')
+_CLEAN_RE = re.compile(r'[^\w\s]')
+
+# spaCy entity labels worth looking up on Wikipedia
+_WIKI_LABELS = frozenset({'PERSON', 'ORG', 'GPE', 'LOC', 'PRODUCT', 'EVENT', 'WORK_OF_ART', 'FAC', 'NORP'})
+
+# Number of concurrent Wikipedia lookups
+WIKI_WORKERS = 8
+
+# MediaWiki endpoints, queried over one keep-alive session
+WIKI_SUMMARY_URL = "https://en.wikipedia.org/api/rest_v1/page/summary/"
+WIKI_SEARCH_URL = "https://en.wikipedia.org/w/api.php"
+WIKI_TIMEOUT = 3
+
+_WIKI_SESSION = requests.Session()
+_WIKI_SESSION.headers.update({'User-Agent': 'YT-Bot/1.0'})
+
+# Semantic cache of previous results, keyed by an embedding of the extracted key terms
+WIKI_CACHE_EMBEDDINGS = os.path.join('.cache', 'wiki_cache.npz')
+WIKI_CACHE_RESULTS = os.path.join('.cache', 'results.pkl')
+WIKI_CACHE_LOCK_FILE = os.path.join('.cache', 'wiki_cache.lock')
+WIKI_CACHE_THRESHOLD = 0.92
+WIKI_CACHE_TERMS = 20
+WIKI_CACHE_MAX_ENTRIES = 2000
+
+# Entries expire after a day, like the server's result caches
+WIKI_CACHE_TTL = 24 * 3600
+
+# New entries are written to disk at most this often (and at exit)
+WIKI_CACHE_FLUSH_INTERVAL = 60
+
+# spaCy pipeline, loaded by initialize()
+nlp = None
+_INITIALIZED = False
+_LOCK = threading.Lock()
+
+_wiki_cache = None  # (embeddings, entries) once loaded from disk
+_wiki_cache_lock = threading.Lock()
+_wiki_cache_pending = []  # (embedding, entry) pairs not yet written to disk
+_wiki_cache_flushed = 0.0
 
 # Ensure NLTK data is available
 def ensure_nltk_data():
@@ -18,59 +78,80 @@ def ensure_nltk_data():
     except LookupError:
         nltk.download('stopwords')
 
+# English stop words, read from the NLTK corpus once
+@functools.lru_cache(maxsize=1)
+def english_stopwords():
+    return frozenset(stopwords.words('english'))
+
 # Load NLP models
 def load_models():
-    try:
-        # Load spaCy for entity recognition
-        nlp = spacy.load("en_core_web_sm")
-        return nlp
-    except:
-        print("Could not load spaCy model. Using fallback methods.")
-        return None
+    global nlp
+    
+    if nlp is None:
+        try:
+            # Load spaCy for entity recognition
+            nlp = spacy.load("en_core_web_sm")
+        except:
+            print("Could not load spaCy model. Using fallback methods.")
+    return nlp
+
+# Prepare NLTK data and the spaCy model once per process
+def initialize():
+    global _INITIALIZED
+    
+    if _INITIALIZED:
+        return
+    
+    with _LOCK:
+        if not _INITIALIZED:
+            ensure_nltk_data()
+            load_models()
+            _INITIALIZED = True
 
 # Faster extraction of key terms with less processing
 def extract_key_terms(text, nlp, max_terms=10):
-    ensure_nltk_data()
+    initialize()
     
     if nlp:
         # Process only the first 5000 characters to speed up extraction
         # This is usually enough to get the main topics
+        # The lemmatizer isn't used here; the parser is kept for noun_chunks
+        disable = [name for name in ('lemmatizer',) if name in nlp.pipe_names]
         sample_text = text[:5000]
-        doc = nlp(sample_text)
+        doc = next(nlp.pipe([sample_text], disable=disable))
         
         # Extract named entities
         entities = []
         for ent in doc.ents:
-            if ent.label_ in ['PERSON', 'ORG', 'GPE', 'LOC', 'PRODUCT', 'EVENT', 'WORK_OF_ART', 'FAC', 'NORP']:
+            if ent.label_ in _WIKI_LABELS:
                 entities.append(ent.text)
         
         # Count entity occurrences and get most common
-        from collections import Counter
         entity_counter = Counter(entities)
         common_entities = [e for e, _ in entity_counter.most_common(max_terms)]
         
+        # The first chunk is usually enough
+        if len(common_entities) >= max_terms:
+            return common_entities
+        
         # If we still need more terms, look for additional entities in chunks
-        if len(common_entities) < max_terms and len(text) > 5000:
+        if len(text) > 5000:
             # Process middle chunk
             mid_point = len(text) // 2
-            mid_sample = text[mid_point:mid_point+2000]
-            mid_doc = nlp(mid_sample)
-            
-            for ent in mid_doc.ents:
-                if ent.label_ in ['PERSON', 'ORG', 'GPE', 'LOC', 'PRODUCT', 'EVENT', 'WORK_OF_ART', 'FAC', 'NORP']:
-                    entities.append(ent.text)
+            samples = [text[mid_point:mid_point+2000]]
             
             # Process end chunk for more coverage
             if len(text) > 7000:
-                end_sample = text[-2000:]
-                end_doc = nlp(end_sample)
-                for ent in end_doc.ents:
-                    if ent.label_ in ['PERSON', 'ORG', 'GPE', 'LOC', 'PRODUCT', 'EVENT', 'WORK_OF_ART', 'FAC', 'NORP']:
-                        entities.append(ent.text)
-        
-        # Update counter with any new entities
-        entity_counter = Counter(entities)
-        common_entities = [e for e, _ in entity_counter.most_common(max_terms)]
+                samples.append(text[-2000:])
+            
+            # Run the extra chunks through spaCy as a single batch
+            extra_docs = list(nlp.pipe(samples, batch_size=len(samples), disable=disable))
+            mid_doc = extra_docs[0]
+            
+            # Update counter with any new entities
+            for extra_doc in extra_docs:
+                entity_counter.update(ent.text for ent in extra_doc.ents if ent.label_ in _WIKI_LABELS)
+            common_entities = [e for e, _ in entity_counter.most_common(max_terms)]
         
         # If we still don't have enough entities, extract noun phrases
         if len(common_entities) < max_terms:
@@ -95,16 +176,14 @@ def extract_key_terms(text, nlp, max_terms=10):
         return common_entities[:max_terms]
     else:
         # Fallback to a simpler word frequency method
-        import re
-        from nltk.corpus import stopwords
-        stop_words = set(stopwords.words('english'))
+        stop_words = english_stopwords()
         
         # Extract words, excluding stop words
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', text.lower())
+        words = _WORD_RE.findall(text.lower())
         filtered_words = [w for w in words if w not in stop_words]
         
         # Also try to find multi-word phrases using regex
-        phrases = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)+\b', text)
+        phrases = _PHRASE_RE.findall(text)
         
         # Combine words and phrases
         all_terms = filtered_words + phrases
@@ -115,67 +194,203 @@ def extract_key_terms(text, nlp, max_terms=10):
         # Return most common
         return [word for word, _ in word_counter.most_common(max_terms)]
 
+def _summarize(page, max_length):
+    """Build the info dict for a REST summary from the first few sentences of its extract."""
+    # Get the first 4-5 sentences instead of just 2
+    short_summary = " ".join(split_sentences(page.get("extract", ""))[:5])
+    
+    # If still too long, truncate
+    if len(short_summary) > max_length:
+        short_summary = short_summary[:max_length] + "..."
+    
+    return {
+        "title": page["title"],
+        "summary": short_summary,
+        "url": page["content_urls"]["desktop"]["page"]
+    }
+
+def _fetch_summary(title):
+    """Fetch the REST summary for a title, following redirects; None if there is no such page."""
+    response = _WIKI_SESSION.get(
+        WIKI_SUMMARY_URL + quote(title.replace(" ", "_"), safe=""),
+        timeout=WIKI_TIMEOUT
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+def _search_titles(term, limit=3):
+    """Full-text search for page titles, for terms that aren't exact titles."""
+    response = _WIKI_SESSION.get(WIKI_SEARCH_URL, params={
+        "action": "query",
+        "list": "search",
+        "srsearch": term,
+        "srlimit": limit,
+        "srprop": "",
+        "format": "json"
+    }, timeout=WIKI_TIMEOUT)
+    response.raise_for_status()
+    return [result["title"] for result in response.json().get("query", {}).get("search", [])]
+
 # Get Wikipedia information for a given term
-def get_wikipedia_info(term, max_length=500):  # Increased max_length for more complete content
+def get_wikipedia_info(term, max_length=500, raise_errors=False):  # Increased max_length for more complete content
     # Clean term name
-    term = re.sub(r'[^\w\s]', '', term).strip()
+    term = _CLEAN_RE.sub('', term).strip()
+    if not term:
+        return None
     
     try:
-        # Search for Wikipedia page
-        search_results = wikipedia.search(term, results=1)
-        
-        if not search_results:
-            return None
-        
-        # Get the page
-        page_title = search_results[0]
-        page = wikipedia.page(page_title, auto_suggest=False)
-        
-        # Extract the summary
-        summary = page.summary
-        
-        # Get the first 4-5 sentences instead of just 2
-        sentences = nltk.sent_tokenize(summary)
-        short_summary = " ".join(sentences[:min(5, len(sentences))])
-        
-        # If still too long, truncate
-        if len(short_summary) > max_length:
-            short_summary = short_summary[:max_length] + "..."
-        
-        return {
-            "title": page.title,
-            "summary": short_summary,
-            "url": page.url
-        }
-    except wikipedia.exceptions.DisambiguationError as e:
-        # Handle disambiguation pages by taking the first option
-        if e.options:
-            try:
-                page = wikipedia.page(e.options[0], auto_suggest=False)
-                summary = page.summary
-                sentences = nltk.sent_tokenize(summary)
-                short_summary = " ".join(sentences[:min(5, len(sentences))])
-                
-                if len(short_summary) > max_length:
-                    short_summary = short_summary[:max_length] + "..."
-                
-                return {
-                    "title": page.title,
-                    "summary": short_summary,
-                    "url": page.url
-                }
-            except:
-                return None
-        return None
+        return _lookup_wikipedia(term, max_length)
     except Exception as e:
+        # Not cached, so a transient network error is retried next time
         print(f"Wikipedia error for term '{term}': {str(e)}")
+        if raise_errors:
+            raise
         return None
 
+# Lookups are memoized on the cleaned term, so repeated terms across videos skip the network
+@functools.lru_cache(maxsize=4096)
+def _lookup_wikipedia(term, max_length):
+    # Most key terms are page titles, so try the summary directly first
+    page = _fetch_summary(term)
+    if page is not None and page.get("type") != "disambiguation":
+        return _summarize(page, max_length)
+    
+    # Otherwise search, and take the first result that isn't a disambiguation page
+    for title in _search_titles(term):
+        if page is not None and title == page.get("title"):
+            continue
+        
+        page = _fetch_summary(title)
+        if page is not None and page.get("type") != "disambiguation":
+            return _summarize(page, max_length)
+    
+    return None
+
+def _load_term_encoder():
+    """Return the SentenceTransformer shared with the timestamps feature, or None."""
+    # initialize() loads the model once per process under its own lock
+    timestamps_feature.initialize()
+    return timestamps_feature.sentence_transformer
+
+def _embed_key_terms(key_terms):
+    """Embed the top key terms as one normalized query vector, or return None."""
+    encoder = _load_term_encoder()
+    if encoder is None or not key_terms:
+        return None
+    
+    query = " ".join(key_terms[:WIKI_CACHE_TERMS])
+    return encoder.encode(query, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+
+def _load_wiki_cache():
+    """Read the persisted embedding table and its parallel results list."""
+    global _wiki_cache
+    
+    if _wiki_cache is None:
+        embeddings, entries = None, []
+        try:
+            with np.load(WIKI_CACHE_EMBEDDINGS) as data:
+                embeddings = data['embeddings']
+            with open(WIKI_CACHE_RESULTS, 'rb') as f:
+                entries = pickle.load(f)
+            if len(entries) != len(embeddings):
+                embeddings, entries = None, []
+        except (OSError, KeyError, ValueError, pickle.PickleError, EOFError):
+            embeddings, entries = None, []
+        _wiki_cache = (embeddings, entries)
+    
+    return _wiki_cache
+
+def _wiki_cache_lookup(query, max_terms):
+    """Return stored results for the most similar earlier term set, if close enough."""
+    with _wiki_cache_lock:
+        embeddings, entries = _load_wiki_cache()
+        if embeddings is None or not len(embeddings):
+            return None
+        
+        # Rows and query are normalized, so the dot product is the cosine similarity
+        sims = embeddings @ query
+        
+        # Only fresh entries computed for at least as many terms can answer this request
+        now = time.time()
+        eligible = np.array([
+            entry["max_terms"] >= max_terms and now - entry.get("stored_at", 0) < WIKI_CACHE_TTL
+            for entry in entries
+        ])
+        sims[~eligible] = -1.0
+        
+        best = int(np.argmax(sims))
+        if sims[best] < WIKI_CACHE_THRESHOLD:
+            return None
+        
+        return entries[best]["results"][:max_terms]
+
+def _wiki_cache_store(query, max_terms, results):
+    """Add a result to the semantic cache, writing new entries to disk every so often."""
+    global _wiki_cache
+    
+    with _wiki_cache_lock:
+        embeddings, entries = _load_wiki_cache()
+        row = query[np.newaxis, :]
+        entry = {"max_terms": max_terms, "results": results, "stored_at": time.time()}
+        embeddings = row if embeddings is None else np.vstack([embeddings, row])[-WIKI_CACHE_MAX_ENTRIES:]
+        entries = (entries + [entry])[-WIKI_CACHE_MAX_ENTRIES:]
+        _wiki_cache = (embeddings, entries)
+        
+        _wiki_cache_pending.append((query, entry))
+        if time.monotonic() - _wiki_cache_flushed >= WIKI_CACHE_FLUSH_INTERVAL:
+            _flush_wiki_cache()
+
+def _flush_wiki_cache():
+    """Merge pending entries into the cache files. The caller holds _wiki_cache_lock."""
+    global _wiki_cache, _wiki_cache_flushed
+    
+    _wiki_cache_flushed = time.monotonic()
+    if not _wiki_cache_pending:
+        return
+    
+    try:
+        os.makedirs(os.path.dirname(WIKI_CACHE_EMBEDDINGS), exist_ok=True)
+        with open(WIKI_CACHE_LOCK_FILE, 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            
+            # Other workers may have written since the files were loaded, so start from disk
+            _wiki_cache = None
+            embeddings, entries = _load_wiki_cache()
+            rows = np.stack([row for row, _ in _wiki_cache_pending])
+            embeddings = rows if embeddings is None else np.vstack([embeddings, rows])
+            entries = entries + [entry for _, entry in _wiki_cache_pending]
+            
+            # Keep the most recent entries that haven't expired
+            now = time.time()
+            fresh = [i for i, entry in enumerate(entries) if now - entry.get("stored_at", 0) < WIKI_CACHE_TTL]
+            fresh = fresh[-WIKI_CACHE_MAX_ENTRIES:]
+            embeddings = embeddings[fresh]
+            entries = [entries[i] for i in fresh]
+            _wiki_cache = (embeddings, entries)
+            
+            suffix = f".{os.getpid()}.tmp"
+            with open(WIKI_CACHE_EMBEDDINGS + suffix, 'wb') as f:
+                np.savez(f, embeddings=embeddings)
+            with open(WIKI_CACHE_RESULTS + suffix, 'wb') as f:
+                pickle.dump(entries, f)
+            os.replace(WIKI_CACHE_EMBEDDINGS + suffix, WIKI_CACHE_EMBEDDINGS)
+            os.replace(WIKI_CACHE_RESULTS + suffix, WIKI_CACHE_RESULTS)
+        _wiki_cache_pending.clear()
+    except OSError as e:
+        print(f"Warning: Could not write wiki cache: {e}")
+
+@atexit.register
+def _flush_wiki_cache_at_exit():
+    with _wiki_cache_lock:
+        _flush_wiki_cache()
+
 # Generate key terms with Wikipedia information
 def generate_key_points_with_wikipedia(transcript, max_terms=8):
     """Generate key terms with Wikipedia information using optimized extraction."""
-    ensure_nltk_data()
-    nlp = load_models()
+    initialize()
     
     print(f"Extracting up to {max_terms} key terms from transcript...")
     
@@ -184,43 +399,54 @@ def generate_key_points_with_wikipedia(transcript, max_terms=8):
     
     print(f"Found {len(key_terms)} potential terms: {', '.join(key_terms[:10])}...")
     
+    # Similar term sets give the same Wikipedia lookups, so reuse an earlier result
+    query = _embed_key_terms(key_terms)
+    if query is not None:
+        cached = _wiki_cache_lookup(query, max_terms)
+        if cached is not None:
+            print("Using cached Wikipedia results for a similar set of key terms")
+            return cached
+    
     # Get Wikipedia info for each term in parallel
     results = []
     processed_titles = set()  # To avoid duplicate Wikipedia articles
+    seen_terms = set()
+    lookup_failed = False
     
-    # Process terms in batches to improve efficiency
-    for i in range(0, len(key_terms), 3):
-        batch = key_terms[i:i+3]
-        batch_results = []
+    # Lookups are independent network calls, so run them concurrently and
+    # consume the answers in term order to keep the original ranking
+    executor = ThreadPoolExecutor(max_workers=WIKI_WORKERS)
+    try:
+        futures = [(term, executor.submit(get_wikipedia_info, term, raise_errors=True)) for term in key_terms]
         
-        for term in batch:
+        for term, future in futures:
             # Skip if we already processed this exact term
-            if term.lower() in [r.get("key_term", "").lower() for r in results]:
+            if term.lower() in seen_terms:
                 continue
-                
-            if len(results) >= max_terms:
-                break
-                
+            seen_terms.add(term.lower())
+            
             print(f"Looking up Wikipedia info for: {term}")
-            wiki_info = get_wikipedia_info(term)
+            try:
+                wiki_info = future.result()
+            except Exception:
+                # Already logged; a transient failure must not end up in the semantic cache
+                lookup_failed = True
+                wiki_info = None
             
             if wiki_info and wiki_info["title"] not in processed_titles:
                 processed_titles.add(wiki_info["title"])
-                batch_results.append({
+                results.append({
                     "key_term": term,
                     "wikipedia_info": wiki_info
                 })
-        
-        # Add batch results to main results
-        results.extend(batch_results)
-        
-        # Check if we have enough results
-        if len(results) >= max_terms:
-            print(f"Reached target of {max_terms} terms with Wikipedia info")
-            break
-        
-        # Add a small delay between batches to avoid rate limiting
-        time.sleep(0.1)
+            
+            # Check if we have enough results
+            if len(results) >= max_terms:
+                print(f"Reached target of {max_terms} terms with Wikipedia info")
+                break
+    finally:
+        # Drop lookups that haven't started once we have enough terms
+        executor.shutdown(wait=False, cancel_futures=True)
     
     print(f"Found {len(results)} terms with Wikipedia info")
     
@@ -238,4 +464,6 @@ def generate_key_points_with_wikipedia(transcript, max_terms=8):
                     break
     
     print(f"Returning {len(results[:max_terms])} key terms total")
+    if query is not None and not lookup_failed:
+        _wiki_cache_store(query, max_terms, results[:max_terms])
     return results[:max_terms]
\ No newline at end of file
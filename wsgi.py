@@ -0,0 +1,9 @@
+"""WSGI entry point for running the API under gunicorn."""
+import server
+
+# Each worker imports this after gunicorn forks it. Models load in a background thread,
+# so the worker starts its heartbeat right away instead of being killed by --timeout
+# during a cold start; /api/health reports 'warming' until they are ready.
+server.startup(background=True)
+
+app = server.app
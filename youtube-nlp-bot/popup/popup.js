@@ -321,7 +321,7 @@ document.addEventListener('DOMContentLoaded', function() {
         resultContent.innerHTML = `
           <div class="factcheck-result">
             <h3>Fact Check & Sentiment Analysis</h3>
-            <p class="factcheck-info">Analysis based on ${details.total_comments} comments from this video</p>
+            <p class="factcheck-info">Analysis based on ${details.sampled ? `a sample of ${details.sample_size} of the ${details.total_comments} comments fetched` : `${details.sample_size} comments`} from this video</p>
             
             <div class="sentiment-container">
               <div class="sentiment-item">
@@ -1,83 +1,414 @@
 from youtube_transcript_api import YouTubeTranscriptApi
 import re
 import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import torch
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+
+# FastSeq patches BART generation (n-gram blocking on GPU, fewer cache reorders)
+# and has to be imported before transformers
+try:
+    import fastseq
+except Exception:
+    fastseq = None
+
+from transformers import (
+    AutoTokenizer, AutoModelForSeq2SeqLM, TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
+)
+
+# Optional CTranslate2 inference engine, used when a converted model is available
+try:
+    import ctranslate2
+except ImportError:
+    ctranslate2 = None
+
+# Summarization checkpoint. DistilBART is faster with comparable ROUGE; set
+# SUMMARIZER_MODEL=facebook/bart-large-cnn for the full-size model
+SUMMARIZER_MODEL = os.environ.get('SUMMARIZER_MODEL', 'sshleifer/distilbart-cnn-12-6')
+
+# Model converted with:
+#   ct2-transformers-converter --model sshleifer/distilbart-cnn-12-6 --output_dir bart-ct2 --quantization int8_float16
+CT2_MODEL_DIR = os.environ.get('SUMMARIZER_CT2_DIR', 'bart-ct2')
+
+# Compile the model's forward pass on GPU (set SUMMARIZER_COMPILE=0 to skip)
+COMPILE_MODEL = os.environ.get('SUMMARIZER_COMPILE', '1') == '1'
 
 # Suppress the warnings
 os.environ['TRANSFORMERS_VERBOSITY'] = 'error'
 import warnings
 warnings.filterwarnings('ignore')
 
+# Video ID after "v=" or a path separator (youtu.be/, /embed/, /shorts/, /live/ ...)
+_VIDEO_ID_RE = re.compile(r'(?:v=|/)([0-9A-Za-z_-]{11})')
+
 def extract_video_id(youtube_url):
     """Extract the video ID from a YouTube URL."""
-    video_id_match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', youtube_url)
-    if video_id_match:
-        return video_id_match.group(1)
+    video_id_match = _VIDEO_ID_RE.search(youtube_url)
+    return video_id_match.group(1) if video_id_match else None
+
+# On-disk summary cache shared between processes, expiring with the server's result caches
+SUMMARY_CACHE_DIR = os.path.join('.cache', 'yt_summary')
+SUMMARY_CACHE_TTL = 24 * 3600
+
+def _cache_path(*key):
+    """Path of the cache file for a key."""
+    name = hashlib.sha256("_".join(map(str, key)).encode('utf-8')).hexdigest()
+    return os.path.join(SUMMARY_CACHE_DIR, name + '.json')
+
+def _read_cache(path):
+    """Return the cached value at path, or None if it is missing or expired."""
+    try:
+        if time.time() - os.path.getmtime(path) < SUMMARY_CACHE_TTL:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
     return None
 
+def _write_cache(path, value):
+    """Atomically write a value to the cache."""
+    try:
+        os.makedirs(SUMMARY_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write summary cache: {e}")
+
 def get_transcript(video_id):
-    """Fetch the transcript for a YouTube video."""
+    """Fetch the transcript for a YouTube video.
+    
+    Not cached here: the server caches transcripts and passes them in.
+    """
     try:
         transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript = ' '.join([item['text'] for item in transcript_list])
-        return transcript
+        return ' '.join(item['text'] for item in transcript_list if item.get('text'))
     except Exception as e:
         print(f"Error fetching transcript: {e}")
         return None
 
+# Checked once at import rather than polling the driver on every call
+_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
 def get_device():
     """Get the appropriate device (GPU or CPU)."""
-    return "cuda" if torch.cuda.is_available() else "cpu"
+    return _DEVICE
+
+def get_dtype(device):
+    """Get the weight dtype: bfloat16 on Ampere+ GPUs, float16 on older GPUs, float32 on CPU."""
+    if device != "cuda":
+        return torch.float32
+    return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+
+# Number of chunks padded and generated together
+SUMMARY_BATCH_SIZE = 8
+
+# Windows are only batched with others in the same 128-token length bucket
+LENGTH_BUCKET = 128
+
+class CancelCriteria(StoppingCriteria):
+    """Stops generation once the given event is set, e.g. when a streaming client disconnects."""
+    
+    def __init__(self, cancelled):
+        self.cancelled = cancelled
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.cancelled.is_set(), dtype=torch.bool, device=input_ids.device)
+
+class TransformersSummarizer:
+    """Summarizes token ids by calling model.generate directly, with inputs already on the device."""
+    
+    def __init__(self, model, tokenizer):
+        self.model = model
+        self.tokenizer = tokenizer
+    
+    def generate_from_ids(self, input_ids, max_length=142, min_length=56, num_beams=4, batch_size=SUMMARY_BATCH_SIZE):
+        """Summarize already tokenized inputs, returning one string per input."""
+        # Sort by length and group similar lengths so batches carry little padding
+        order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]))
+        batches = []
+        for i in order:
+            bucket = -(-len(input_ids[i]) // LENGTH_BUCKET)
+            if batches and batches[-1][0] == bucket and len(batches[-1][1]) < batch_size:
+                batches[-1][1].append(i)
+            else:
+                batches.append((bucket, [i]))
+        
+        summaries = [None] * len(input_ids)
+        for _, indices in batches:
+            # Pad and move the whole batch to the device once, before generation starts
+            batch = self.tokenizer.pad(
+                {"input_ids": [input_ids[i] for i in indices]},
+                return_tensors="pt"
+            ).to(self.model.device)
+            
+            with torch.inference_mode():
+                output_ids = self.model.generate(
+                    **batch,
+                    max_length=max_length,
+                    min_length=min_length,
+                    num_beams=num_beams,
+                    early_stopping=True,
+                    no_repeat_ngram_size=3,
+                    use_cache=True
+                )
+            
+            # Put results back in the original input order
+            for i, summary in zip(indices, self.tokenizer.batch_decode(output_ids, skip_special_tokens=True)):
+                summaries[i] = summary
+        return summaries
+    
+    def stream_from_ids(self, input_ids, max_length=142, min_length=56):
+        """Yield summary text for one input as tokens are generated.
+        
+        Streaming only supports a single sequence with greedy decoding.
+        """
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        inputs = torch.tensor([input_ids], device=self.model.device)
+        cancelled = threading.Event()
+        errors = []
+        
+        def generate():
+            try:
+                with torch.inference_mode():
+                    self.model.generate(
+                        input_ids=inputs,
+                        max_length=max_length,
+                        min_length=min_length,
+                        num_beams=1,
+                        no_repeat_ngram_size=3,
+                        use_cache=True,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([CancelCriteria(cancelled)])
+                    )
+            except Exception as e:
+                # Unblock the consumer, then report the error from its thread
+                errors.append(e)
+                streamer.end()
+        
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+        try:
+            yield from streamer
+        finally:
+            # If the consumer stopped early (client disconnected), end generation at the next step
+            cancelled.set()
+            thread.join()
+        
+        if errors:
+            raise errors[0]
+
+class CTranslate2Summarizer:
+    """Summarizer with the same interface backed by the CTranslate2 engine."""
+    
+    def __init__(self, model_dir, tokenizer, device):
+        compute_type = "int8_float16" if device == "cuda" else "int8"
+        self.translator = ctranslate2.Translator(model_dir, device=device, compute_type=compute_type)
+        self.tokenizer = tokenizer
+    
+    def generate_from_ids(self, input_ids, max_length=142, min_length=56, num_beams=4, batch_size=SUMMARY_BATCH_SIZE):
+        """Summarize already tokenized inputs, returning one string per input."""
+        # CTranslate2 works on token strings rather than ids
+        sources = [self.tokenizer.convert_ids_to_tokens(ids) for ids in input_ids]
+        
+        # Same decoding settings as the BART CNN generation configs
+        results = self.translator.translate_batch(
+            sources,
+            max_batch_size=batch_size,
+            beam_size=num_beams,
+            length_penalty=2.0,
+            no_repeat_ngram_size=3,
+            min_decoding_length=min_length,
+            max_decoding_length=max_length
+        )
+        
+        # Hypotheses hold only generated tokens, any special tokens are skipped when decoding
+        return [
+            self.tokenizer.decode(
+                self.tokenizer.convert_tokens_to_ids(result.hypotheses[0]),
+                skip_special_tokens=True
+            )
+            for result in results
+        ]
+    
+    def stream_from_ids(self, input_ids, max_length=142, min_length=56):
+        """Yield the summary for one input; CTranslate2 returns it in one piece."""
+        yield self.generate_from_ids([input_ids], max_length=max_length, min_length=min_length, num_beams=1)[0]
+
+def compile_model(model, tokenizer):
+    """Compile the forward pass with torch.compile and run warmup generations to compile it."""
+    try:
+        # Default mode, not reduce-overhead: CUDA graphs are bound to the thread that
+        # captured them, while requests and streamed generations run on other threads
+        model.forward = torch.compile(model.forward, mode="default", dynamic=True)
+        
+        # The first calls are slow while kernels are compiled, so pay for them here with
+        # the same generate arguments and a representative input length as a request
+        summarizer = TransformersSummarizer(model, tokenizer)
+        dummy = tokenizer("warmup " * 512, truncation=True)["input_ids"]
+        for num_beams in (NUM_BEAMS, 1):
+            summarizer.generate_from_ids([dummy], max_length=20, min_length=5, num_beams=num_beams)
+        print("Summarization model compiled")
+    except Exception as e:
+        print(f"Could not compile summarization model, running eagerly: {e}")
+        model.forward = type(model).forward.__get__(model)
+    return model
 
-def create_summarizer(model_name="facebook/bart-large-cnn"):
-    """Create a summarization pipeline with the specified model."""
+# Summarizers already loaded in this process, by model name
+_SUMMARIZERS = {}
+_summarizer_lock = threading.Lock()
+
+def create_summarizer(model_name=SUMMARIZER_MODEL):
+    """Create a summarizer for the specified model.
+    
+    Cached per model name, so weights are loaded and moved to the device once per process.
+    The warmup thread and request threads may ask at the same time, so the first load
+    is serialized.
+    """
+    summarizer = _SUMMARIZERS.get(model_name)
+    if summarizer is not None:
+        return summarizer
+    
+    with _summarizer_lock:
+        if model_name not in _SUMMARIZERS:
+            _SUMMARIZERS[model_name] = _load_summarizer(model_name)
+    return _SUMMARIZERS[model_name]
+
+def _load_summarizer(model_name):
+    """Load the tokenizer and model and wrap them in the fastest available summarizer."""
     device = get_device()
     print(f"Using device: {device.upper()}")
     
-    # Load model and tokenizer
+    # Load model and tokenizer, directly in half precision on GPU
     tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    
+    # Prefer the CTranslate2 engine when a converted model is available
+    if ctranslate2 is not None and os.path.isdir(CT2_MODEL_DIR):
+        try:
+            summarizer = CTranslate2Summarizer(CT2_MODEL_DIR, tokenizer, device)
+            print(f"Using CTranslate2 model from {CT2_MODEL_DIR}")
+            return summarizer
+        except Exception as e:
+            print(f"Could not load CTranslate2 model, using transformers: {e}")
+    
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=get_dtype(device))
     model = model.to(device)
+    model.eval()
     
-    # Create summarization pipeline
-    summarizer = pipeline(
-        "summarization", 
-        model=model, 
-        tokenizer=tokenizer, 
-        device=0 if device == "cuda" else -1
-    )
+    # Reuse past key/values across decoder steps instead of recomputing attention
+    model.config.use_cache = True
+    model.generation_config.use_cache = True
+    
+    if device == "cuda" and COMPILE_MODEL and hasattr(torch, "compile"):
+        model = compile_model(model, tokenizer)
     
-    return summarizer
+    # On CPU, run the linear layers as int8 matmuls
+    if device == "cpu":
+        try:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            print("Using int8 dynamic quantization on CPU")
+        except Exception as e:
+            print(f"Could not quantize summarization model: {e}")
+    
+    return TransformersSummarizer(model, tokenizer)
+
+# Whitespace after sentence-ending punctuation
+_SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])\s+')
+
+def _iter_sentence_spans(text):
+    """Yield (start, end) offsets of each sentence without building the sentence strings."""
+    start = 0
+    for match in _SENTENCE_BREAK_RE.finditer(text):
+        yield start, match.start()
+        start = match.end()
+    yield start, len(text)
 
 def extract_key_sentences(text, num_sentences=5):
     """Extract key sentences from text as a fallback method."""
-    # Split into sentences
-    sentences = re.split(r'(?<=[.!?])\s+', text)
+    # Count sentences in one scan, then only slice out the ones we keep
+    total = sum(1 for _ in _iter_sentence_spans(text))
     
-    if len(sentences) <= num_sentences:
-        return ' '.join(sentences)
+    if total <= num_sentences:
+        return ' '.join(text[start:end] for start, end in _iter_sentence_spans(text))
     
-    # Take first sentence (often contains the main topic)
-    key_sentences = [sentences[0]]
+    # Evenly spaced sentences, always including the first (often the main topic)
+    # and the last (often the conclusion)
+    wanted = set(np.linspace(0, total - 1, num_sentences, dtype=int).tolist())
+    return ' '.join(
+        text[start:end]
+        for i, (start, end) in enumerate(_iter_sentence_spans(text))
+        if i in wanted
+    )
+
+# BART's positional embeddings cover 1024 tokens
+MAX_INPUT_TOKENS = 1024
+
+# Beam width by input length: short windows lose little with a narrower beam
+SHORT_INPUT_TOKENS = 300
+SHORT_NUM_BEAMS = 2
+NUM_BEAMS = 4
+
+# Failed windows are retried once, cut down to this many tokens
+RETRY_INPUT_TOKENS = 512
+
+# Combined chunk summaries up to this multiple of max_length skip the meta-summary
+META_SUMMARY_SLACK = 1.2
+
+def num_beams_for(num_tokens):
+    """Beam width for an input of num_tokens tokens."""
+    return SHORT_NUM_BEAMS if num_tokens < SHORT_INPUT_TOKENS else NUM_BEAMS
+
+def split_token_windows(tokenizer, text):
+    """Tokenize text once and split it into evenly sized windows that fit the model input."""
+    ids = tokenizer(text, add_special_tokens=False, verbose=False).input_ids
+    if not ids:
+        return []
     
-    # Take some sentences from the middle
-    middle_start = len(sentences) // 4
-    middle_end = 3 * len(sentences) // 4
-    middle_step = (middle_end - middle_start) // (num_sentences - 2)
+    # Leave room for BOS/EOS, and spread tokens evenly so there is no tiny tail window
+    window_limit = min(tokenizer.model_max_length, MAX_INPUT_TOKENS) - 2
+    num_windows = -(-len(ids) // window_limit)
+    window_size = -(-len(ids) // num_windows)
     
-    if middle_step < 1:
-        middle_step = 1
+    return [
+        tokenizer.build_inputs_with_special_tokens(ids[i:i + window_size])
+        for i in range(0, len(ids), window_size)
+    ]
+
+def generate_summaries(summarizer, windows, batch_size=SUMMARY_BATCH_SIZE, num_beams=None, **generate_kwargs):
+    """Summarize token-id windows, returning one summary string per window.
     
-    for i in range(middle_start, middle_end, middle_step):
-        if len(key_sentences) < num_sentences - 1 and i < len(sentences):
-            key_sentences.append(sentences[i])
+    The beam width is picked per window from its length unless num_beams is given.
+    """
+    if num_beams is not None:
+        return summarizer.generate_from_ids(windows, num_beams=num_beams, batch_size=batch_size, **generate_kwargs)
     
-    # Take last sentence (often contains conclusion)
-    if sentences[-1] not in key_sentences:
-        key_sentences.append(sentences[-1])
+    # One call per beam width, as each generate call takes a single beam size
+    summaries = [None] * len(windows)
+    for num_beams in {num_beams_for(len(window)) for window in windows}:
+        indices = [i for i, window in enumerate(windows) if num_beams_for(len(window)) == num_beams]
+        results = summarizer.generate_from_ids(
+            [windows[i] for i in indices],
+            num_beams=num_beams,
+            batch_size=batch_size,
+            **generate_kwargs
+        )
+        for i, summary in zip(indices, results):
+            summaries[i] = summary
+    return summaries
+
+def summary_lengths(word_count, target_min_length, target_max_length):
+    """Adjust min_length and max_length based on input text length."""
+    # For shorter content, we want shorter summaries
+    min_length = min(target_min_length, max(30, word_count // 10))
+    max_length = min(target_max_length, max(min_length + 50, word_count // 3))
     
-    return ' '.join(key_sentences)
+    print(f"Using min_length={min_length}, max_length={max_length}")
+    return min_length, max_length
 
 def summarize_text(text, target_min_length=100, target_max_length=300):
     """Generate a comprehensive summary of the provided text."""
@@ -90,72 +421,56 @@ def summarize_text(text, target_min_length=100, target_max_length=300):
         print("Text too short for abstractive summarization, using extractive method")
         return extract_key_sentences(text, num_sentences=3)
     
-    # Create summarizer once
+    # Reuse the cached summarizer
     summarizer = create_summarizer()
+    min_length, max_length = summary_lengths(word_count, target_min_length, target_max_length)
     
-    # Adjust min_length and max_length based on input text length
-    # For shorter content, we want shorter summaries
-    min_length = min(target_min_length, max(30, word_count // 10))
-    max_length = min(target_max_length, max(min_length + 50, word_count // 3))
-    
-    print(f"Using min_length={min_length}, max_length={max_length}")
-    
-    # Split into chunks of appropriate size for the model
-    # BART can handle ~1024 tokens
-    max_chunk_length = 800  # Words, not tokens, but approximate
-    chunks = []
-    
-    words = text.split()
-    for i in range(0, len(words), max_chunk_length):
-        chunk = ' '.join(words[i:i + max_chunk_length])
-        if len(chunk.split()) >= 50:  # Only add chunks with reasonable length
-            chunks.append(chunk)
+    # Tokenize once and split into windows of up to 1024 tokens for the model
+    chunks = split_token_windows(summarizer.tokenizer, text)
     
     # If no valid chunks, use extractive method
     if not chunks:
         return extract_key_sentences(text)
     
-    # Process each chunk
-    all_summaries = []
-    for i, chunk in enumerate(chunks):
-        print(f"Summarizing chunk {i+1}/{len(chunks)}...")
-        
-        # First try with specified parameters
-        try:
-            result = summarizer(
-                chunk, 
-                max_length=max_length // len(chunks), 
-                min_length=min_length // len(chunks), 
-                do_sample=False,
-                truncation=True
-            )
-            
-            if result and len(result) > 0:
-                all_summaries.append(result[0]['summary_text'])
-                continue  # Skip to next chunk if successful
-        except Exception as e:
-            print(f"Initial summarization attempt failed: {e}")
-        
-        # If the first attempt failed, try with more permissive parameters
+    # Summarize all chunks in batched generate calls
+    print(f"Summarizing {len(chunks)} chunks...")
+    all_summaries = [None] * len(chunks)
+    try:
+        results = generate_summaries(
+            summarizer,
+            chunks, 
+            max_length=max_length // len(chunks), 
+            min_length=min_length // len(chunks)
+        )
+        for i, summary in enumerate(results):
+            all_summaries[i] = summary.strip() or None
+    except Exception as e:
+        print(f"Initial summarization attempt failed: {e}")
+    
+    # If the first attempt failed, retry only the failed chunks once with shorter inputs
+    failed = [i for i, summary in enumerate(all_summaries) if not summary]
+    if failed:
         try:
-            print(f"Retrying chunk {i+1} with adjusted parameters")
-            result = summarizer(
-                chunk, 
+            print(f"Retrying chunks {[i + 1 for i in failed]} with truncated input")
+            # Keep each window's final EOS token
+            truncated = [chunks[i][:RETRY_INPUT_TOKENS - 1] + chunks[i][-1:] for i in failed]
+            results = generate_summaries(
+                summarizer,
+                truncated, 
                 max_length=max_length, 
-                min_length=10,  # Very low min_length
-                do_sample=True,  # Enable sampling
-                truncation=True
+                min_length=10  # Very low min_length
             )
-            
-            if result and len(result) > 0:
-                all_summaries.append(result[0]['summary_text'])
-                continue
+            for i, summary in zip(failed, results):
+                all_summaries[i] = summary.strip() or None
         except Exception as e:
             print(f"Second summarization attempt failed: {e}")
-        
-        # If both attempts failed, extract key sentences from this chunk
-        print(f"Using extractive fallback for chunk {i+1}")
-        all_summaries.append(extract_key_sentences(chunk, num_sentences=2))
+    
+    # If both attempts failed, extract key sentences from this chunk
+    for i, summary in enumerate(all_summaries):
+        if not summary:
+            print(f"Using extractive fallback for chunk {i+1}")
+            chunk_text = summarizer.tokenizer.decode(chunks[i], skip_special_tokens=True)
+            all_summaries[i] = extract_key_sentences(chunk_text, num_sentences=2)
     
     # Combine the summaries
     if not all_summaries:
@@ -169,37 +484,111 @@ def summarize_text(text, target_min_length=100, target_max_length=300):
     
     # Generate meta-summary for better coherence if needed
     try:
+        meta_ids = summarizer.tokenizer(
+            combined_summary,
+            truncation=True,
+            max_length=MAX_INPUT_TOKENS
+        ).input_ids
+        
+        # Chunk summaries that already fit the target length don't need a second pass
+        if len(meta_ids) <= max_length * META_SUMMARY_SLACK:
+            return combined_summary
+        
         print("Generating meta-summary for better coherence...")
-        meta_result = summarizer(
-            combined_summary, 
+        meta_result = generate_summaries(
+            summarizer,
+            [meta_ids], 
             max_length=max_length,
             min_length=min_length,
-            do_sample=False,
-            truncation=True
-        )
+            num_beams=SHORT_NUM_BEAMS  # A summary of summaries needs less search
+        )[0].strip()
         
-        if meta_result and len(meta_result) > 0:
-            return meta_result[0]['summary_text']
+        if meta_result:
+            return meta_result
     except Exception as e:
         print(f"Meta-summarization failed: {e}")
     
     return combined_summary
 
-def summarize_youtube_video(youtube_url, min_length=100, max_length=300):
-    """Main function to summarize a YouTube video from its URL."""
+def stream_summary(text, target_min_length=100, target_max_length=300):
+    """Yield a summary of the text piece by piece as it is generated.
+    
+    Chunks are summarized one after another and their text is streamed as it is decoded,
+    so the first words arrive long before the whole summary is done. Token streaming
+    needs greedy decoding of one sequence at a time, and there is no meta-summary pass.
+    """
+    word_count = len(text.split())
+    
+    # For very short videos (< 200 words), use extractive summarization
+    if word_count < 200:
+        yield extract_key_sentences(text, num_sentences=3)
+        return
+    
+    summarizer = create_summarizer()
+    min_length, max_length = summary_lengths(word_count, target_min_length, target_max_length)
+    
+    chunks = split_token_windows(summarizer.tokenizer, text)
+    if not chunks:
+        yield extract_key_sentences(text)
+        return
+    
+    for i, chunk in enumerate(chunks):
+        if i > 0:
+            yield ' '
+        
+        pieces = summarizer.stream_from_ids(
+            chunk,
+            max_length=max_length // len(chunks),
+            min_length=min_length // len(chunks)
+        )
+        streamed = False
+        try:
+            for piece in pieces:
+                streamed = True
+                yield piece
+        except Exception as e:
+            print(f"Streaming summarization failed for chunk {i+1}: {e}")
+            # Text already sent can't be taken back, so only fall back if nothing was
+            if not streamed:
+                chunk_text = summarizer.tokenizer.decode(chunk, skip_special_tokens=True)
+                yield extract_key_sentences(chunk_text, num_sentences=2)
+        finally:
+            pieces.close()
+
+def summarize_youtube_video(youtube_url, min_length=100, max_length=300, transcript=None):
+    """Main function to summarize a YouTube video from its URL.
+    
+    An already fetched transcript can be passed in to skip downloading it again.
+    """
     # Extract video ID from URL
     video_id = extract_video_id(youtube_url)
     if not video_id:
         return "Invalid YouTube URL. Please provide a valid URL.", None
     
-    # Get transcript
-    transcript = get_transcript(video_id)
+    # Reuse a summary generated earlier with the same model and settings
+    summary_path = _cache_path('summary', SUMMARIZER_MODEL, video_id, min_length, max_length)
+    summary = _read_cache(summary_path)
+    
+    if summary is not None:
+        if transcript is None:
+            transcript = get_transcript(video_id)
+        return summary, transcript
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Load the model while the transcript is downloaded (a no-op once it is cached)
+        executor.submit(create_summarizer)
+        
+        # Get transcript
+        if transcript is None:
+            transcript = get_transcript(video_id)
+    
     if not transcript:
         return "Could not retrieve transcript. The video might not have captions.", None
     
     # Generate summary
     print(f"Generating summary (target length: {min_length}-{max_length} words)...")
     summary = summarize_text(transcript, target_min_length=min_length, target_max_length=max_length)
+    _write_cache(summary_path, summary)
     
     return summary, transcript
 